@@ -1,13 +1,50 @@
 import argparse
 import ast
+import csv
+import functools
+import itertools
+import re
 from pathlib import Path
-from typing import List, Any, Optional
+from typing import Iterator, List, Any, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 import matplotlib.pyplot as plt
+from pandas.api.types import union_categoricals
 
-from sklearn.preprocessing import MultiLabelBinarizer, OneHotEncoder, MinMaxScaler
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pacsv
+    from pyarrow import json as pajson
+    from pyarrow import parquet as pq
+except ImportError:  # pyarrow is optional; fall back to the pandas readers/writers
+    pa = None
+
+# Only these columns of movies_metadata.csv feed the features; read them as
+# strings and coerce numerics ourselves since TMDB has a few malformed rows
+USED_COLUMNS = ["id", "original_title", "overview", "budget", "adult", "original_language", "genres"]
+USED_COLUMN_DTYPES = {col: "string" for col in USED_COLUMNS}
+
+# Parquet (zstd, dictionary-encoded) is the default output whenever pyarrow is available
+DEFAULT_OUTPUT = Path("movies_preprocessed.parquet" if pa is not None else "movies_preprocessed.csv")
+
+# pandas < 3 copies every block in concat unless told not to; pandas >= 3 is
+# copy-on-write and deprecates the keyword
+CONCAT_NO_COPY = {"copy": False} if int(pd.__version__.split(".")[0]) < 3 else {}
+
+# Pulls the genre names straight out of the raw "[{'id': .., 'name': '..'}]" strings
+GENRE_NAME_PATTERN = re.compile(r"'name':\s*'([^']*)'")
+# The regex only sees single-quoted names; a row whose 'name' keys it cannot
+# all account for (e.g. repr's "Children's") goes through extract_genre_names
+GENRE_NAME_KEY = "'name':"
+GENRE_DOUBLE_QUOTED_NAME = "'name': \""
+
+# Recognised spellings of the TMDB 'adult' flag
+ADULT_TRUE_VALUES = {"true", "t", "1", "yes", "y"}
+ADULT_FALSE_VALUES = {"false", "f", "0", "no", "n"}
+ADULT_TRUTH_TABLE = {**{v: True for v in ADULT_TRUE_VALUES}, **{v: False for v in ADULT_FALSE_VALUES}}
 
 
 def extract_genre_names(genres_value: Any) -> List[str]:
@@ -20,7 +57,7 @@ def extract_genre_names(genres_value: Any) -> List[str]:
     """
     if isinstance(genres_value, list):
         try:
-            return [g.get("name", "") for g in genres_value if isinstance(g, dict) and "name" in g]
+            return [g["name"] for g in genres_value if isinstance(g, dict) and isinstance(g.get("name"), str)]
         except Exception:
             return []
 
@@ -28,7 +65,7 @@ def extract_genre_names(genres_value: Any) -> List[str]:
         try:
             parsed = ast.literal_eval(genres_value)
             if isinstance(parsed, list):
-                return [g.get("name", "") for g in parsed if isinstance(g, dict) and "name" in g]
+                return [g["name"] for g in parsed if isinstance(g, dict) and isinstance(g.get("name"), str)]
         except (ValueError, SyntaxError):
             # Fall through to empty
             pass
@@ -36,6 +73,23 @@ def extract_genre_names(genres_value: Any) -> List[str]:
     return []
 
 
+def genre_names_complete(genres_value: str, n_names: int) -> bool:
+    """
+    True when n_names GENRE_NAME_PATTERN matches account for every 'name' key
+    in a raw genres string, i.e. no name was double-quoted or otherwise missed.
+    """
+    return n_names == genres_value.count(GENRE_NAME_KEY) and GENRE_DOUBLE_QUOTED_NAME not in genres_value
+
+
+def regex_genre_names(genres_value: str) -> List[str]:
+    """
+    Fast path for extract_genre_names on a raw genres string: the compiled
+    regex, falling back to extract_genre_names when it cannot parse the row fully.
+    """
+    names = GENRE_NAME_PATTERN.findall(genres_value)
+    return names if genre_names_complete(genres_value, len(names)) else extract_genre_names(genres_value)
+
+
 def coerce_adult(value: Any) -> bool:
     """
     Coerce TMDB 'adult' values into booleans:
@@ -50,64 +104,448 @@ def coerce_adult(value: Any) -> bool:
         return bool(value)
     if isinstance(value, str):
         s = value.strip().lower()
-        if s in {"true", "t", "1", "yes", "y"}:
+        if s in ADULT_TRUE_VALUES:
             return True
-        if s in {"false", "f", "0", "no", "n"}:
+        if s in ADULT_FALSE_VALUES:
             return False
     return False
 
 
-def build_one_hot_encoder():
+def _coerce_adult_str(adult: pd.Series) -> pd.Series:
+    # Normalise once with the string accessor, then a truth-table lookup (unknown -> False)
+    adult_norm = adult.astype("string").str.strip().str.lower()
+    return adult_norm.map(ADULT_TRUTH_TABLE).fillna(False).astype(bool)
+
+
+def _coerce_adult_bool(adult: pd.Series) -> pd.Series:
+    # Booleans pass through; missing (nullable boolean) -> False
+    return adult.fillna(False).astype(bool)
+
+
+def _coerce_adult_num(adult: pd.Series) -> pd.Series:
+    # Numbers are True when non-zero; missing -> False
+    return adult.fillna(0).astype(bool)
+
+
+# Column-level coerce_adult, selected once per column by dtype.kind
+ADULT_KERNELS = {
+    "b": _coerce_adult_bool,
+    "i": _coerce_adult_num,
+    "u": _coerce_adult_num,
+    "f": _coerce_adult_num,
+    "O": _coerce_adult_str,
+    "U": _coerce_adult_str,
+    "S": _coerce_adult_str,
+}
+
+
+def coerce_adult_column(adult: pd.Series) -> pd.Series:
     """
-    Build a OneHotEncoder that works across sklearn versions.
-    sklearn >= 1.2: use sparse_output
-    sklearn < 1.2: fall back to sparse
+    Vectorized coerce_adult over a whole column: the kernel is picked from
+    ADULT_KERNELS by dtype, with a per-value fallback for any other dtype and
+    for object columns that do not hold only strings.
     """
-    try:
-        return OneHotEncoder(sparse_output=False, handle_unknown="ignore")
-    except TypeError:
-        return OneHotEncoder(sparse=False, handle_unknown="ignore")
+    kernel = ADULT_KERNELS.get(adult.dtype.kind)
+    if kernel is _coerce_adult_str and pd.api.types.infer_dtype(adult, skipna=True) != "string":
+        kernel = None
+    if kernel is None:
+        return adult.map(coerce_adult).astype(bool)
+    return kernel(adult)
 
 
-def preprocess(
-    input_csv: Path,
-    output_path: Path,
-    plot_path: Optional[Path] = None,
-    save_parquet: bool = False,
-) -> None:
-    print("Starting Preprocessing...")
-    print(f"Loading CSV data from: {input_csv}")
+def genre_tokens_to_csr(
+    tokens: Sequence[str],
+    lengths: np.ndarray,
+    classes: Optional[Sequence[str]] = None,
+) -> Tuple[sp.csr_matrix, List[str]]:
+    """
+    Multi-hot encode a flat stream of genre names, where row i owns the next
+    lengths[i] tokens. Equivalent to MultiLabelBinarizer (sorted classes,
+    0/1 entries). Pass classes to encode against a fixed vocabulary; a null
+    token or one outside it raises ValueError. Returns (matrix of shape
+    (len(lengths), n_genres), genre names).
+    """
+    if not isinstance(tokens, pd.Series):
+        tokens = pd.Series(tokens, dtype=object)
+    if classes is None:
+        codes, classes = pd.factorize(tokens, sort=True)
+    else:
+        codes = pd.Index(classes).get_indexer(tokens)
+    # A -1 code would be used as a column index and corrupt the CSR
+    if (codes < 0).any():
+        unknown = tokens[codes < 0].unique().tolist()
+        raise ValueError(f"Genre tokens missing or not in the vocabulary: {unknown[:10]}")
+    indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    data = np.ones(len(codes), dtype=np.uint8)
+    mat = sp.csr_matrix((data, codes, indptr), shape=(len(lengths), len(classes)))
+    # Repeated genres within a row collapse to a single 1, as with MultiLabelBinarizer
+    mat.sum_duplicates()
+    mat.data[:] = 1
+    return mat, [str(g) for g in classes]
 
-    # Read with low_memory=False for mixed dtypes; allow caller to pass any CSV
-    movies = pd.read_csv(input_csv, low_memory=False)
-    print(f"Loaded {len(movies)} movies")
 
-    # Genres
-    movies["genres_list"] = movies.get("genres", pd.Series([np.nan] * len(movies))).apply(extract_genre_names)
+def flatten_genre_lists(genres_list: Sequence[List[str]]) -> Tuple[List[str], np.ndarray]:
+    """
+    Flatten a sequence of genre-name lists into one token stream plus per-row
+    counts, the input genre_tokens_to_csr expects.
+    """
+    lengths = np.fromiter((len(names) for names in genres_list), dtype=np.int64, count=len(genres_list))
+    return list(itertools.chain.from_iterable(genres_list)), lengths
 
-    # Budget: numeric + treat zeros as missing; apply log1p then min-max scale
-    movies["budget"] = pd.to_numeric(movies.get("budget", pd.Series([np.nan] * len(movies))), errors="coerce")
-    # Consider 0 as missing for TMDB budgets
-    movies.loc[movies["budget"] == 0, "budget"] = np.nan
-    budget_log = np.log1p(movies["budget"].fillna(0))
-    scaler = MinMaxScaler()
-    movies["budget_norm"] = scaler.fit_transform(budget_log.to_frame())
+
+# Byte-level equivalent of GENRE_NAME_PATTERN for the numba scanner
+GENRE_NAME_PREFIX = np.frombuffer(b"'name':", dtype=np.uint8)
+
+
+@functools.lru_cache(maxsize=None)
+def _genre_scan_kernels():
+    """
+    Build the numba byte-scanning kernels on first use; numba is slow to
+    import, so it is only loaded when the scanner is asked for.
+    numba's str support is weak, so the kernels scan a flat uint8 buffer with
+    per-row offsets. Raises ImportError without numba.
+    """
+    from numba import njit, prange
+
+    @njit(cache=True)
+    def _find_genre_name(buf, prefix, pos, end):
+        """Return (start, stop) of the next quoted name in buf[pos:end], or (-1, -1)."""
+        n = prefix.size
+        i = pos
+        while i + n <= end:
+            matched = True
+            for k in range(n):
+                if buf[i + k] != prefix[k]:
+                    matched = False
+                    break
+            if matched:
+                j = i + n
+                # \s: space, \t, \n, \v, \f, \r
+                while j < end and (buf[j] == 32 or 9 <= buf[j] <= 13):
+                    j += 1
+                if j < end and buf[j] == 39:
+                    stop = j + 1
+                    while stop < end and buf[stop] != 39:
+                        stop += 1
+                    if stop < end:
+                        return j + 1, stop
+            i += 1
+        return -1, -1
+
+    @njit(parallel=True, cache=True)
+    def _count_genre_names(buf, offsets, prefix):
+        n_rows = offsets.size - 1
+        counts = np.zeros(n_rows, dtype=np.int64)
+        for row in prange(n_rows):
+            pos = offsets[row]
+            end = offsets[row + 1]
+            count = 0
+            while True:
+                start, stop = _find_genre_name(buf, prefix, pos, end)
+                if start < 0:
+                    break
+                count += 1
+                pos = stop + 1
+            counts[row] = count
+        return counts
+
+    @njit(parallel=True, cache=True)
+    def _locate_genre_names(buf, offsets, prefix, indptr):
+        starts = np.empty(indptr[-1], dtype=np.int64)
+        stops = np.empty(indptr[-1], dtype=np.int64)
+        for row in prange(offsets.size - 1):
+            pos = offsets[row]
+            end = offsets[row + 1]
+            out = indptr[row]
+            while True:
+                start, stop = _find_genre_name(buf, prefix, pos, end)
+                if start < 0:
+                    break
+                starts[out] = start
+                stops[out] = stop
+                out += 1
+                pos = stop + 1
+        return starts, stops
+
+    return _count_genre_names, _locate_genre_names
+
+
+def scan_genre_tokens(genres: pd.Series) -> Tuple[List[str], np.ndarray]:
+    """
+    Extract genre names from raw TMDB 'genres' strings with the parallel numba
+    scanner: rows are scanned independently over one concatenated byte buffer
+    and only the located name spans are decoded. Requires numba (ImportError).
+    Returns (flat token stream, per-row counts).
+    """
+    count_genre_names, locate_genre_names = _genre_scan_kernels()
+    values = genres.fillna("").tolist()
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    raw = b"".join(encoded)
+    buf = np.frombuffer(raw, dtype=np.uint8)
+
+    lengths = count_genre_names(buf, offsets, GENRE_NAME_PREFIX)
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    starts, stops = locate_genre_names(buf, offsets, GENRE_NAME_PREFIX, indptr)
+    tokens = [raw[start:stop].decode("utf-8") for start, stop in zip(starts.tolist(), stops.tolist())]
+    # Like the regex, the scanner only sees single-quoted names; reparse rows it missed
+    unparsed = [i for i, value in enumerate(values) if not genre_names_complete(value, lengths[i])]
+    if unparsed:
+        rows = [tokens[start:stop] for start, stop in zip(indptr[:-1].tolist(), indptr[1:].tolist())]
+        for i in unparsed:
+            rows[i] = extract_genre_names(values[i])
+        return flatten_genre_lists(rows)
+    return tokens, lengths
+
+
+def arrow_genre_tokens(genres: pd.Series) -> Tuple[pd.Series, np.ndarray]:
+    """
+    Parse raw TMDB 'genres' strings as JSON with pyarrow's C++ reader: quotes
+    and None are rewritten to JSON, each row becomes one NDJSON line and is
+    read as list<struct<name: string>>. Tokens stay Arrow-backed (no Python
+    str per genre). Requires pyarrow; raises pa.ArrowInvalid when a row is
+    not valid JSON after the rewrite (e.g. a double-quoted name).
+    """
+    text = pa.large_string()
+    col = pa.array(genres.fillna("[]"), type=text)
+    if isinstance(col, pa.ChunkedArray):
+        col = col.combine_chunks()
+    # Blank strings carry no genres; make them an empty JSON list
+    col = pc.replace_substring_regex(col, r"^\s*$", "[]")
+    col = pc.replace_substring(col, "'", '"')
+    # Only None used as a value; "None" inside a genre name stays as is
+    col = pc.replace_substring_regex(col, r"(:\s*)None\b", r"\1null")
+    col = pc.replace_substring(col, "\n", " ")
+    lines = pc.binary_join_element_wise(pa.scalar('{"g":', text), col, pa.scalar("}\n", text), pa.scalar("", text))
+    doc = pc.binary_join(pa.ListArray.from_arrays(pa.array([0, len(lines)], pa.int32()), lines), pa.scalar("", text))
+    doc_bytes = doc.buffers()[2].slice(0, pc.binary_length(doc)[0].as_py())
+
+    table = pajson.read_json(
+        pa.BufferReader(doc_bytes),
+        parse_options=pajson.ParseOptions(
+            explicit_schema=pa.schema([("g", pa.list_(pa.struct([("name", pa.string())])))]),
+            unexpected_field_behavior="ignore",
+        ),
+    )
+    parsed = table.column("g").combine_chunks()
+    names = pc.struct_field(pc.list_flatten(parsed), "name")
+    # Dicts without a 'name' (or with 'name': None) give null names; skip them
+    # like the regex does and count only the remaining names per row
+    valid = pc.is_valid(names)
+    rows = pc.filter(pc.list_parent_indices(parsed), valid).to_numpy(zero_copy_only=False)
+    lengths = np.bincount(rows, minlength=len(parsed)).astype(np.int64)
+    return pd.Series(pc.filter(names, valid), dtype=pd.ArrowDtype(pa.string())), lengths
+
+
+def extract_genre_tokens(genres: pd.Series, genre_parser: str = "regex") -> Tuple[Sequence[str], np.ndarray]:
+    """
+    Extract genre names from a 'genres' column as (flat token stream, per-row counts).
+    Raw strings use the compiled regex unless genre_parser asks for the
+    parallel numba byte scanner ("numba") or pyarrow's JSON reader ("arrow");
+    those fall back to the regex when their library is missing (or, for
+    "arrow", when a row is not JSON after the rewrite). Rows the regex or the
+    scanner cannot fully parse, and already-parsed values, go through the
+    slow parser.
+    """
+    if pd.api.types.is_string_dtype(genres) and genre_parser == "numba":
+        try:
+            return scan_genre_tokens(genres)
+        except ImportError:
+            pass  # numba is optional; fall through to the other parsers
+    if pd.api.types.is_string_dtype(genres) and genre_parser == "arrow" and pa is not None:
+        try:
+            return arrow_genre_tokens(genres)
+        except pa.ArrowInvalid:
+            pass  # not JSON after the quote rewrite; the regex handles it
+    if pd.api.types.is_string_dtype(genres):
+        # Plain list + C-level findall beats the .str accessor's Series round-trips
+        return flatten_genre_lists(list(map(regex_genre_names, genres.to_numpy(dtype=object, na_value="[]"))))
+    return flatten_genre_lists(genres.apply(extract_genre_names).tolist())
+
+
+def encode_genres(
+    genres: pd.Series,
+    classes: Optional[Sequence[str]] = None,
+    genre_parser: str = "regex",
+) -> Tuple[sp.csr_matrix, List[str]]:
+    """
+    Multi-hot encode a raw 'genres' column (see genre_tokens_to_csr for classes,
+    extract_genre_tokens for genre_parser).
+    TMDB repeats the same genre strings across many movies, so string columns
+    are parsed once per distinct value and the rows gathered from that matrix.
+    """
+    if not pd.api.types.is_string_dtype(genres):
+        return genre_tokens_to_csr(*extract_genre_tokens(genres, genre_parser), classes)
+    codes, distinct = pd.factorize(genres, use_na_sentinel=False)
+    distinct_tokens, distinct_lengths = extract_genre_tokens(pd.Series(distinct, dtype=genres.dtype), genre_parser)
+    distinct_csr, classes = genre_tokens_to_csr(distinct_tokens, distinct_lengths, classes)
+    return distinct_csr[codes], classes
+
+
+def union_vocabulary(vocab: Optional[pd.Categorical], values: Sequence[str]) -> pd.Categorical:
+    """
+    Grow a vocabulary (a Categorical holding each category once) with the
+    distinct values seen in one more chunk. Categories are kept sorted.
+    """
+    distinct = pd.unique(pd.Series(values, dtype=object))
+    chunk_vocab = pd.Categorical(distinct, categories=pd.Index(distinct, dtype=object))
+    merged = chunk_vocab if vocab is None else union_categoricals([vocab, chunk_vocab], sort_categories=True)
+    # union_categoricals may infer a str dtype for the categories; keep them
+    # object so the next chunk's vocabulary still unions with them
+    categories = pd.Index(merged.categories, dtype=object).sort_values()
+    return pd.Categorical(categories, categories=categories)
+
+
+def to_arrow_table(df: pd.DataFrame) -> "pa.Table":
+    """
+    Convert a frame to a pyarrow Table, densifying any SparseDtype columns
+    (pyarrow has no sparse column type). Drops the index.
+    """
+    sparse_dtypes = {col: dtype.subtype for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)}
+    return pa.Table.from_pandas(df.astype(sparse_dtypes), preserve_index=False)
+
+
+def write_csv(df: pd.DataFrame, path: Path, append: bool = False) -> None:
+    """
+    Write a frame as CSV without its index, using pyarrow's multi-threaded
+    writer when available, otherwise pandas. append=True adds rows to an
+    existing file without repeating the header.
+    """
+    if pa is None:
+        df.to_csv(path, mode="a" if append else "w", header=not append, index=False)
+        return
+    options = pacsv.WriteOptions(include_header=not append)
+    with open(path, "ab" if append else "wb") as f:
+        pacsv.write_csv(to_arrow_table(df), f, write_options=options)
+
+
+def load_movies(input_csv: Path) -> pd.DataFrame:
+    """
+    Load the used columns of a TMDB-like CSV as strings.
+    Uses pyarrow's multi-threaded CSV reader when available, otherwise pandas.
+    Columns missing from the CSV are simply absent from the result.
+    """
+    if pa is None:
+        return pd.read_csv(
+            input_csv,
+            usecols=lambda col: col in USED_COLUMN_DTYPES,
+            dtype=USED_COLUMN_DTYPES,
+            engine="c",
+        )
+
+    with open(input_csv, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    columns = [col for col in USED_COLUMNS if col in header]
+
+    table = pacsv.read_csv(
+        input_csv,
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={col: pa.string() for col in columns},
+            include_columns=columns,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def iter_movie_chunks(input_csv: Path, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream the used columns of a TMDB-like CSV as strings, chunksize rows at a time.
+    Each chunk gets a fresh RangeIndex.
+    """
+    reader = pd.read_csv(
+        input_csv,
+        usecols=lambda col: col in USED_COLUMN_DTYPES,
+        dtype=USED_COLUMN_DTYPES,
+        engine="c",
+        chunksize=chunksize,
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk.reset_index(drop=True)
+
+
+def log_budget(movies: pd.DataFrame) -> np.ndarray:
+    """
+    Clean movies["budget"] in place (numeric, TMDB's 0 placeholder -> NaN) and
+    return its log1p as float32, counting missing budgets as 0.
+    """
+    budget = pd.to_numeric(movies.get("budget", pd.Series([np.nan] * len(movies))), errors="coerce")
+    # Consider 0 as missing for TMDB budgets (masked before assigning, not scattered into the frame)
+    movies["budget"] = budget.mask(budget.eq(0)).to_numpy(dtype=np.float64, na_value=np.nan)
+    budget_log = movies["budget"].to_numpy(dtype=np.float32, copy=True)
+    np.nan_to_num(budget_log, copy=False, nan=0.0)
+    return np.log1p(budget_log, out=budget_log)
+
+
+def budget_range_of(budget_log: np.ndarray) -> Tuple[float, float]:
+    """
+    (min, max) of the finite log budgets, as MinMaxScaler would fit them:
+    a negative budget gives NaN (or -inf) after log1p and is left out.
+    (inf, -inf) when there are none, so ranges combine with min/max.
+    """
+    finite = budget_log[np.isfinite(budget_log)]
+    return (float(finite.min()), float(finite.max())) if finite.size else (np.inf, -np.inf)
+
+
+def build_features(
+    movies: pd.DataFrame,
+    genre_classes: Optional[Sequence[str]] = None,
+    lang_categories: Optional[Sequence[str]] = None,
+    budget_range: Optional[Tuple[float, float]] = None,
+    genre_parser: str = "regex",
+) -> Tuple[pd.DataFrame, sp.csr_matrix, List[str]]:
+    """
+    Turn loaded movies (RangeIndex) into the ML-ready frame.
+    The genre/language vocabularies and the budget (min, max) used for scaling
+    default to those of movies itself; pass them to encode chunks of a larger
+    input consistently. genre_parser is passed on to extract_genre_tokens.
+    Returns (frame, genre CSR, genre names).
+    """
+    # Genres -> sparse multi-hot CSR
+    genres = movies.get("genres", pd.Series([np.nan] * len(movies)))
+    genre_csr, genre_classes = encode_genres(genres, genre_classes, genre_parser)
+
+    # Budget: log1p then min-max scale, in place on one float32 array (constant column -> 0)
+    budget_log = log_budget(movies)
+    if budget_range is None:
+        budget_range = budget_range_of(budget_log)
+    lo, hi = budget_range
+    if hi > lo:
+        budget_log -= lo
+        budget_log /= hi - lo
+    else:
+        # Non-finite rows stay as they are, like MinMaxScaler's NaN passthrough
+        budget_log[np.isfinite(budget_log)] = 0.0
+    movies["budget_norm"] = budget_log
 
     # Adult flag -> bool
-    movies["adult"] = movies.get("adult", pd.Series([False] * len(movies))).apply(coerce_adult)
+    movies["adult"] = coerce_adult_column(movies.get("adult", pd.Series([False] * len(movies))))
 
-    # Language -> one-hot
-    movies["original_language"] = movies.get("original_language", pd.Series(["unknown"] * len(movies))).fillna("unknown")
-    ohe = build_one_hot_encoder()
-    lang_arr = ohe.fit_transform(movies[["original_language"]])
-    lang_cols = [f"lang_{str(cat)}" for cat in ohe.categories_[0]]
-    language_df = pd.DataFrame(lang_arr, columns=lang_cols).astype(np.uint8)
+    # Language -> sparse one-hot: categorical once, then one non-zero per row at its category code
+    language = movies.get("original_language", pd.Series(["unknown"] * len(movies))).fillna("unknown")
+    if lang_categories is None:
+        movies["original_language"] = language.astype("category")
+    else:
+        # An unseen language would get code -1 and corrupt the CSR
+        unknown = ~language.isin(lang_categories)
+        if unknown.any():
+            raise ValueError(f"Languages not in the vocabulary: {language[unknown].unique().tolist()[:10]}")
+        movies["original_language"] = language.astype(pd.CategoricalDtype(lang_categories))
+    lang_codes = movies["original_language"].cat.codes.to_numpy()
+    lang_categories = movies["original_language"].cat.categories
+    lang_csr = sp.csr_matrix(
+        (np.ones(len(movies), dtype=np.uint8), lang_codes, np.arange(len(movies) + 1)),
+        shape=(len(movies), len(lang_categories)),
+    )
+    lang_cols = [f"lang_{cat}" for cat in lang_categories]
+    language_df = pd.DataFrame.sparse.from_spmatrix(lang_csr, index=movies.index, columns=lang_cols)
 
-    # Genres -> MultiLabelBinarizer
-    mlb = MultiLabelBinarizer()
-    genre_arr = mlb.fit_transform(movies["genres_list"])
-    genre_cols = [f"genre_{g}" for g in mlb.classes_]
-    genre_df = pd.DataFrame(genre_arr, columns=genre_cols).astype(np.uint8)
+    # Genre columns are kept sparse (uint8, fill 0) in the frame
+    genre_cols = [f"genre_{g}" for g in genre_classes]
+    genre_df = pd.DataFrame.sparse.from_spmatrix(genre_csr, index=movies.index, columns=genre_cols)
 
     # Assemble final frame
     base_cols = []
@@ -115,37 +553,124 @@ def preprocess(
         if col in movies.columns:
             base_cols.append(col)
 
-    processed_df = pd.concat(
-        [
-            movies[base_cols].reset_index(drop=True),
-            genre_df.reset_index(drop=True),
-            language_df.reset_index(drop=True),
-        ],
-        axis=1,
-    )
+    # All parts share movies' RangeIndex, so no re-indexing or extra copy is needed
+    processed_df = pd.concat([movies[base_cols], genre_df, language_df], axis=1, **CONCAT_NO_COPY)
+    return processed_df, genre_csr, genre_classes
+
+
+def preprocess_chunked(
+    input_csv: Path,
+    output_path: Path,
+    chunksize: int,
+    to_parquet: bool,
+    genre_parser: str = "regex",
+) -> pd.Series:
+    """
+    Bounded-memory variant of preprocess: two passes over the CSV, chunksize
+    rows at a time. Pass 1 collects the genre/language vocabularies and the
+    budget range; pass 2 encodes each chunk against them and appends it to a
+    Parquet file (row group per chunk) or CSV. Returns per-genre counts.
+    """
+    genre_vocab = lang_vocab = None
+    lo, hi = np.inf, -np.inf
+    for movies in iter_movie_chunks(input_csv, chunksize):
+        genres = movies.get("genres", pd.Series([np.nan] * len(movies)))
+        distinct = genres.drop_duplicates() if pd.api.types.is_string_dtype(genres) else genres
+        genre_tokens, _ = extract_genre_tokens(distinct, genre_parser)
+        genre_vocab = union_vocabulary(genre_vocab, genre_tokens)
+        language = movies.get("original_language", pd.Series(["unknown"] * len(movies))).fillna("unknown")
+        lang_vocab = union_vocabulary(lang_vocab, language.tolist())
+        chunk_lo, chunk_hi = budget_range_of(log_budget(movies))
+        lo, hi = min(lo, chunk_lo), max(hi, chunk_hi)
+
+    if genre_vocab is None:
+        raise ValueError(f"No rows found in {input_csv}")
+    genre_classes = list(genre_vocab.categories)
+    lang_categories = list(lang_vocab.categories)
+    genre_totals = np.zeros(len(genre_classes), dtype=np.int64)
+
+    writer = None
+    try:
+        for i, movies in enumerate(iter_movie_chunks(input_csv, chunksize)):
+            processed_df, genre_csr, _ = build_features(movies, genre_classes, lang_categories, (lo, hi), genre_parser)
+            genre_totals += np.asarray(genre_csr.sum(axis=0), dtype=np.int64).ravel()
+            if to_parquet:
+                table = to_arrow_table(processed_df)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema, compression="zstd", use_dictionary=True)
+                writer.write_table(table)
+            else:
+                write_csv(processed_df, output_path, append=i > 0)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return pd.Series(genre_totals, index=[f"genre_{g}" for g in genre_classes])
+
+
+def preprocess(
+    input_csv: Path,
+    output_path: Path,
+    plot_path: Optional[Path] = None,
+    save_parquet: bool = False,
+    chunksize: Optional[int] = None,
+    genre_parser: str = "regex",
+) -> None:
+    print("Starting Preprocessing...")
+    print(f"Loading CSV data from: {input_csv}")
 
-    # Save output
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    if save_parquet or output_path.suffix.lower() == ".parquet":
-        try:
-            processed_df.to_parquet(output_path, index=False)
-            print(f"Preprocessing complete! Data saved to {output_path} (Parquet)")
-        except Exception as e:
-            # Fallback to CSV if parquet engine is missing
-            csv_fallback = output_path.with_suffix(".csv")
-            processed_df.to_csv(csv_fallback, index=False)
-            print(f"Parquet not available ({e}). Saved CSV to {csv_fallback}")
+    if chunksize is not None:
+        to_parquet = save_parquet or output_path.suffix.lower() == ".parquet"
+        if to_parquet and pa is None:
+            output_path = output_path.with_suffix(".csv")
+            print(f"Parquet not available (pyarrow is not installed). Streaming CSV to {output_path}")
+        genre_counts = preprocess_chunked(
+            input_csv, output_path, chunksize, to_parquet and pa is not None, genre_parser
+        )
+        print(f"Preprocessing complete! Data streamed to {output_path} in chunks of {chunksize} rows")
+        genre_counts = genre_counts.sort_values(ascending=False)
     else:
-        processed_df.to_csv(output_path, index=False)
-        print(f"Preprocessing complete! Data saved to {output_path}")
+        # Read only the columns we use with fixed dtypes (no type inference); columns
+        # missing from the CSV are tolerated and defaulted below
+        movies = load_movies(input_csv).reset_index(drop=True)
+        print(f"Loaded {len(movies)} movies")
+
+        processed_df, genre_csr, genre_classes = build_features(movies, genre_parser=genre_parser)
+
+        # Save output
+        if save_parquet or output_path.suffix.lower() == ".parquet":
+            try:
+                if pa is None:
+                    raise ImportError("pyarrow is not installed")
+                pq.write_table(
+                    to_arrow_table(processed_df),
+                    output_path,
+                    compression="zstd",
+                    use_dictionary=True,
+                )
+                print(f"Preprocessing complete! Data saved to {output_path} (Parquet)")
+            except Exception as e:
+                # Fallback to CSV if parquet engine is missing
+                csv_fallback = output_path.with_suffix(".csv")
+                write_csv(processed_df, csv_fallback)
+                print(f"Parquet not available ({e}). Saved CSV to {csv_fallback}")
+        else:
+            write_csv(processed_df, output_path)
+            print(f"Preprocessing complete! Data saved to {output_path}")
+
+        # Column sums straight off the CSR rather than the frame's sparse columns
+        genre_counts = pd.Series(
+            np.asarray(genre_csr.sum(axis=0), dtype=np.int64).ravel(),
+            index=[f"genre_{g}" for g in genre_classes],
+        ).sort_values(ascending=False)
 
     # Visualization (optional)
-    if plot_path is not None and len(genre_cols) > 0:
+    if plot_path is not None and len(genre_counts) > 0:
         try:
             print("Creating visualizations...")
-            genre_counts = processed_df[genre_cols].sum().sort_values(ascending=False)
             plt.figure(figsize=(12, 6))
             genre_counts.plot(kind="bar", color="skyblue")
             plt.title("Movie Genre Distribution")
@@ -156,7 +681,9 @@ def preprocess(
 
             plot_path = Path(plot_path)
             plot_path.parent.mkdir(parents=True, exist_ok=True)
-            plt.savefig(plot_path, dpi=150)
+            # Flat-colour bar chart: a lighter PNG zlib level writes much faster for a slightly larger file
+            png_kwargs = {"pil_kwargs": {"compress_level": 3}} if plot_path.suffix.lower() == ".png" else {}
+            plt.savefig(plot_path, dpi=150, **png_kwargs)
             plt.close()
             print(f"Visualization saved to {plot_path}")
         except Exception as e:
@@ -174,8 +701,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--output",
         type=Path,
-        default=Path("movies_preprocessed.csv"),
-        help="Output file path (.csv or .parquet). Default: movies_preprocessed.csv",
+        default=DEFAULT_OUTPUT,
+        help=f"Output file path (.csv or .parquet). Default: {DEFAULT_OUTPUT}",
     )
     parser.add_argument(
         "--plot",
@@ -188,9 +715,30 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Save output as Parquet (overrides output extension if provided).",
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream the CSV in chunks of this many rows (bounded memory, two passes over the input).",
+    )
+    parser.add_argument(
+        "--genre-parser",
+        choices=["regex", "numba", "arrow"],
+        default="regex",
+        help="How to parse the raw genres strings: 'numba' (parallel byte scanner) or 'arrow' (pyarrow JSON "
+        "reader) if installed. Both were slower than the regex in single-core measurements; any multi-core "
+        "speedup is unmeasured. Default: regex",
+    )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    preprocess(args.input, args.output, plot_path=args.plot, save_parquet=args.parquet)
+    preprocess(
+        args.input,
+        args.output,
+        plot_path=args.plot,
+        save_parquet=args.parquet,
+        chunksize=args.chunksize,
+        genre_parser=args.genre_parser,
+    )
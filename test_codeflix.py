@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import codeflix
+
+GENRE_EDGE_CASES = [
+    "[{'id': 28, 'name': 'Action'}, {'id': 35, 'name': 'Comedy'}]",
+    "[{'id': 1}]",
+    "[{'id': 1, 'name': None}, {'id': 2, 'name': 'Drama'}]",
+    "[{'id': 10751, 'name': \"Children's\"}]",
+    "[{'id': 2, 'name': 'None Shall Pass'}]",
+    "[]",
+    "",
+    None,
+]
+
+
+def available_parsers():
+    parsers = ["regex"]
+    try:
+        codeflix._genre_scan_kernels()
+        parsers.append("numba")
+    except ImportError:
+        pass
+    if codeflix.pa is not None:
+        parsers.append("arrow")
+    return parsers
+
+
+def as_lists(tokens, lengths):
+    tokens = [str(t) for t in tokens]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return [tokens[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+@pytest.mark.parametrize("genre_parser", available_parsers())
+def test_genre_parsers_match_extract_genre_names(genre_parser):
+    genres = pd.Series(GENRE_EDGE_CASES, dtype="string")
+    expected = [codeflix.extract_genre_names(value) for value in GENRE_EDGE_CASES]
+
+    assert as_lists(*codeflix.extract_genre_tokens(genres, genre_parser)) == expected
+
+
+@pytest.mark.skipif(codeflix.pa is None, reason="pyarrow is not installed")
+def test_arrow_genre_tokens_match_extract_genre_names_without_fallback():
+    # Children's is not valid JSON after the quote rewrite and would send the
+    # whole column to the regex, so leave it out to exercise the arrow parser
+    cases = [value for value in GENRE_EDGE_CASES if value is None or "Children" not in value]
+    genres = pd.Series(cases, dtype="string")
+    expected = [codeflix.extract_genre_names(value) for value in cases]
+
+    assert as_lists(*codeflix.arrow_genre_tokens(genres)) == expected
+
+
+@pytest.mark.parametrize("genre_parser", available_parsers())
+def test_genre_parsers_handle_empty_input(genre_parser):
+    tokens, lengths = codeflix.extract_genre_tokens(pd.Series([], dtype="string"), genre_parser)
+
+    assert len(tokens) == 0
+    assert len(lengths) == 0
+
+
+@pytest.mark.parametrize("genre_parser", available_parsers())
+def test_encode_genres_skips_null_names(genre_parser):
+    genres = pd.Series(GENRE_EDGE_CASES * 2, dtype="string")
+
+    matrix, classes = codeflix.encode_genres(genres, genre_parser=genre_parser)
+
+    assert classes == ["Action", "Children's", "Comedy", "Drama", "None Shall Pass"]
+    assert matrix.shape == (len(genres), len(classes))
+    assert matrix.sum() == 2 * 5
+
+
+def test_regex_genre_names_matches_extract_genre_names():
+    cases = [value for value in GENRE_EDGE_CASES if value is not None] + [
+        "[{'id': 16, 'name': 'Animation'}, {'id': 10751, 'name': \"Children's\"}]",
+        "[{'id': 18, 'name':\"Drama\"}]",
+    ]
+
+    assert [codeflix.regex_genre_names(value) for value in cases] == [
+        codeflix.extract_genre_names(value) for value in cases
+    ]
+
+
+def test_extract_genre_names_skips_missing_names():
+    parsed = [{"id": 1}, {"id": 2, "name": None}, {"id": 3, "name": "Drama"}]
+
+    assert codeflix.extract_genre_names(parsed) == ["Drama"]
+    assert codeflix.extract_genre_names(str(parsed)) == ["Drama"]
+
+
+def test_genre_tokens_to_csr_rejects_unknown_tokens():
+    with pytest.raises(ValueError):
+        codeflix.genre_tokens_to_csr(["Action", "Western"], np.array([2]), classes=["Action"])
+    with pytest.raises(ValueError):
+        codeflix.genre_tokens_to_csr(pd.Series(["Action", None], dtype="string"), np.array([2]))
+
+
+def test_load_movies_strips_byte_order_mark(tmp_path):
+    input_csv = tmp_path / "movies.csv"
+    input_csv.write_text("id,budget,genres\n1,10,[]\n", encoding="utf-8-sig")
+
+    assert list(codeflix.load_movies(input_csv).columns) == ["id", "budget", "genres"]
+
+
+def test_build_features_scales_budget_ignoring_negative_budgets():
+    movies = pd.DataFrame({"budget": pd.Series(["-5", "10", "100"], dtype="string")})
+
+    with np.errstate(invalid="ignore"):
+        processed_df, _, _ = codeflix.build_features(movies)
+
+    assert processed_df["budget_norm"].tolist()[1:] == [0.0, 1.0]
+    assert np.isnan(processed_df["budget_norm"].iloc[0])
+
+
+@pytest.mark.parametrize(
+    "values, dtype",
+    [
+        (["True", " false", "1", "yes", None, "maybe"], "string"),
+        (["True", " false", "1", "yes", None, "maybe"], object),
+        ([1.0, 2, True, 0, None, "no"], object),
+    ],
+)
+def test_coerce_adult_column_matches_coerce_adult(values, dtype):
+    adult = pd.Series(values, dtype=dtype)
+
+    assert codeflix.coerce_adult_column(adult).tolist() == [codeflix.coerce_adult(v) for v in adult]
+
+
+MOVIES_CSV = """id,original_title,overview,budget,adult,original_language,genres
+1,Heat,"A heist, gone wrong",60000000,False,en,"[{'id': 28, 'name': 'Action'}, {'id': 80, 'name': 'Crime'}]"
+2,Amélie,,0,False,fr,"[{'id': 35, 'name': 'Comedy'}]"
+3,Babe,Pig,30000000,False,en,"[{'id': 10751, 'name': \"\"Children's\"\"}]"
+4,Untitled,,,True,,[]
+5,Oldboy,Revenge,3000000,false,ko,"[{'id': 18, 'name': 'Drama'}, {'id': 53, 'name': 'Thriller'}]"
+6,Heat 2,,-5,0,en,"[{'id': 28, 'name': 'Action'}]"
+7,Jeux,"Multi
+line",1000,1,fr,
+"""
+
+
+def read_output(path):
+    return pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path, dtype=str)
+
+
+requires_pyarrow = pytest.mark.skipif(codeflix.pa is None, reason="pyarrow is not installed")
+
+
+@pytest.mark.parametrize("suffix", [".csv", pytest.param(".parquet", marks=requires_pyarrow)])
+def test_preprocess_chunked_matches_in_memory(tmp_path, suffix):
+    input_csv = tmp_path / "movies.csv"
+    input_csv.write_text(MOVIES_CSV, encoding="utf-8")
+
+    with np.errstate(invalid="ignore"):
+        codeflix.preprocess(input_csv, tmp_path / f"full{suffix}")
+        codeflix.preprocess(input_csv, tmp_path / f"chunked{suffix}", chunksize=2)
+
+    full = read_output(tmp_path / f"full{suffix}")
+    chunked = read_output(tmp_path / f"chunked{suffix}")
+    assert "genre_Children's" in full.columns
+    pd.testing.assert_frame_equal(chunked, full)
+
+
+def test_build_features_rejects_values_outside_the_vocabulary():
+    movies = pd.DataFrame({
+        "original_language": pd.Series(["en", "xx"], dtype="string"),
+        "genres": pd.Series(["[{'id': 28, 'name': 'Action'}]", "[]"], dtype="string"),
+    })
+
+    with pytest.raises(ValueError, match="Languages"):
+        codeflix.build_features(movies.copy(), ["Action"], ["en"])
+    with pytest.raises(ValueError, match="Genre"):
+        codeflix.build_features(movies.copy(), ["Drama"], ["en", "xx"])